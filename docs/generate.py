@@ -4,8 +4,6 @@
 # License, v. 2.0. If a copy of the MPL was not distributed with this
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
-import re
-from io import BytesIO
 from pathlib import Path
 from shutil import which
 from subprocess import run
@@ -14,7 +12,7 @@ from typing import cast
 
 import fitz
 import qrcode
-from qrcode.image.svg import SvgImage, SvgPathImage
+from qrcode.image.svg import SvgPathImage
 
 from polyqr import QrCodePainter
 
@@ -26,41 +24,36 @@ tikz_path = base_path / "tikz.tex"
 # Create a LaTeX file with three TikZ pictures representing
 # https://github.com/KurtBoehm/polyqr as a QR code: A PolyQR version, a PolyQR version
 # with rounded corners, and a basic one that draws each module as a separate rectangle.
+lines = [
+    r"\documentclass[tikz]{standalone}",
+    "",
+    r"\usepackage{tikz}",
+    "",
+    r"\begin{document}",
+]
+
+# Add a PolyQR version
+painter = QrCodePainter(msg)
+lines.append(painter.tikz(size="1mm", style=""))
+
+# Add a PolyQR version with rounded corners; the polygons only need to be
+# extracted once for both styles.
+lines.append(painter.tikz(size="1mm", style="rounded corners=0.25mm"))
+
+# Add a basic version that draws one rectangle per module, taken straight
+# from the Boolean module matrix.
+lines.append(r"\begin{tikzpicture}[x=1mm, y=-1mm]")
+lines.extend(
+    f"  \\fill ({c}, {r}) rectangle ++ (1, 1);"
+    for r, row in enumerate(painter.modules)
+    for c, v in enumerate(row)
+    if v
+)
+lines.append(r"\end{tikzpicture}")
+lines.append(r"\end{document}")
+
 with open(tikz_path, "w") as f:
-    print(r"\documentclass[tikz]{standalone}", file=f)
-    print(file=f)
-    print(r"\usepackage{tikz}", file=f)
-    print(file=f)
-    print(r"\begin{document}", file=f)
-
-    # Add a PolyQR version
-    painter = QrCodePainter(msg)
-    print(painter.tikz(size="1mm", style=""), file=f)
-
-    # Add a PolyQR version with rounded corners
-    painter = QrCodePainter(msg)
-    print(painter.tikz(size="1mm", style="rounded corners=0.25mm"), file=f)
-
-    # Add a basic version that converts the output of `qrcode.svg.SvgImage`,
-    # which generates an SVG `rect` element for each module, into the equivalent
-    # TikZ code with one rectangle per module.
-    qr = qrcode.QRCode()
-    qr.add_data(msg)
-    qr.make()
-    img = qr.make_image(image_factory=SvgImage)
-    io = BytesIO()
-    img.save(io)
-    svg = io.getvalue().decode()
-    regex = re.compile(
-        r'<svg:rect x="(\d+)mm" y="(\d+)mm" width="(\d+)mm" height="(\d+)mm" />'
-    )
-
-    print(r"\begin{tikzpicture}[x=1mm, y=-1mm]", file=f)
-    for m in regex.findall(svg):
-        x, y, w, h = cast(tuple[str, str, str, str], m)
-        print(f"  \\fill ({x}, {y}) rectangle ++ ({w}, {h});", file=f)
-    print(r"\end{tikzpicture}", file=f)
-    print(r"\end{document}", file=f)
+    f.write("\n".join(lines) + "\n")
 
 # Compile the generated LaTeX code, rasterize each page at a 640×640 pixel resolution,
 # and optimize the resulting PNG files if `oxipng` is available.
@@ -98,5 +91,4 @@ with open(base_path / "svg-qrcode.svg", "wb") as f:
 
 # Create an SVG version of the QR code using PolyQR.
 with open(base_path / "svg-polyqr.svg", "w") as f:
-    painter = QrCodePainter(msg)
-    print(painter.svg, file=f)
+    f.write(painter.svg + "\n")
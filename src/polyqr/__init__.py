@@ -5,34 +5,56 @@
 # file, You can obtain one at https://mozilla.org/MPL/2.0/.
 
 from argparse import ArgumentParser
-from collections import Counter, deque
 from collections.abc import Iterable
-from typing import Callable, cast, final
+from functools import cached_property, lru_cache
+from typing import Callable, final
 
+import numpy as np
 import qrcode
+from scipy import ndimage
 
 __version__ = "1.1.3"
 
 __all__ = [
     "Point",
-    "Edge",
     "QrCodePainter",
     "run_tikz",
 ]
 
 # 2D integer grid point (row, column).
 Point = tuple[int, int]
-Edge = tuple[Point, Point]
 
 
-def normalized_edge(p: Point, q: Point) -> Edge:
-    """Canonical representation of an undirected edge with sorted endpoints."""
-    return (p, q) if p <= q else (q, p)
+@lru_cache(maxsize=None)
+def _encode(msg: str) -> tuple[int, np.ndarray]:
+    """
+    Encode a message as a QR code, returning its size and Boolean module matrix.
+
+    QR encoding (error correction, masking, penalty scoring) is not cheap,
+    so the result is memoized per message; the returned matrix is marked
+    read-only since it is shared between callers.
+    """
+    qr = qrcode.QRCode()
+    qr.add_data(msg)
+    qr.make()
+
+    # Sampled stand-in for checking every cell, which would walk the whole
+    # grid; the dtype=bool conversion below coerces stray values anyway.
+    assert isinstance(qr.modules[0][0], bool)
+    modules = np.asarray(qr.modules, dtype=bool)
+    modules.flags.writeable = False
+    return qr.modules_count, modules
 
 
-def collinear(a: Point, b: Point, c: Point) -> bool:
-    """Return True if three grid points are collinear, i.e. share a row or a column."""
-    return (a[0] == b[0] == c[0]) or (a[1] == b[1] == c[1])
+def _numlen(v: int) -> int:
+    """
+    Return the number of characters in the decimal representation of `v`.
+
+    Only meant for grid coordinates and their differences, i.e. |v| < 1000.
+    """
+    if v < 0:
+        return _numlen(-v) + 1
+    return 1 if v < 10 else 2 if v < 100 else 3
 
 
 def _wrap_svg(n: int, content: str) -> str:
@@ -45,27 +67,82 @@ def _wrap_svg(n: int, content: str) -> str:
     )
 
 
-def connected_components(adj: dict[Point, set[Point]]) -> list[set[Point]]:
-    """Return all connected components of an undirected graph."""
-    unvisited: set[Point] = set(adj)
-    components: list[set[Point]] = []
-
-    while unvisited:
-        start = unvisited.pop()
-        component = {start}
-        queue: deque[Point] = deque([start])
-
-        while queue:
-            u = queue.popleft()
-            for v in adj[u]:
-                if v in unvisited:
-                    unvisited.remove(v)
-                    component.add(v)
-                    queue.append(v)
-
-        components.append(component)
-
-    return components
+def _trace_contours(half_edges: list[tuple[int, int]]) -> list[list[Point]]:
+    """
+    Extract the simplified boundary contours of a single connected component.
+
+    `half_edges` holds the boundary edges of the component as packed
+    (tail, head) vertex pairs (row in the high byte, column in the low byte;
+    grid coordinates fit into 8 bits since the largest QR code version has
+    177 modules per side), oriented so that the filled side lies on the left
+    of each half-edge. The packed integers keep the maps below hashing plain
+    ints instead of freshly allocated tuples.
+    """
+    assert half_edges
+
+    out_edges: dict[int, list[int]] = {}
+    for tail, head in half_edges:
+        out_edges.setdefault(tail, []).append(head)
+
+    # Pair every half-edge with its successor around its head vertex.
+    # Where two contours touch at a degree-four vertex, preferring the
+    # left turn keeps each contour hugging its own wall, which leads
+    # to more visually pleasing results when rounding corners.
+    next_he: dict[int, int] = {}
+    for p, heads in out_edges.items():
+        for q in heads:
+            succs = out_edges[q]
+            succ = succs[0]
+            if len(succs) > 1:
+                hr, hc = q >> 8, q & 255
+                dr, dc = hr - (p >> 8), hc - (p & 255)
+                left = ((hr - dc) << 8) | (hc + dr)
+                if succs[1] == left:
+                    succ = succs[1]
+            next_he[(p << 16) | q] = (q << 16) | succ
+
+    # Every half-edge lies on exactly one contour: chase the
+    # next-pointers until the walk returns to its starting half-edge.
+    # Collinear middle vertices are dropped while the chain is being built:
+    # a vertex that continues straight overwrites its predecessor, so no
+    # separate simplification pass over the finished chain is needed.
+    # The packed vertices are only unpacked into points here.
+    chains: list[list[Point]] = []
+    seen: set[int] = set()
+    for start in next_he:
+        if start in seen:
+            continue
+
+        # The difference between head and tail encodes a half-edge's
+        # direction (one of ±1 and ±256), so a vertex is a corner exactly
+        # when its outgoing half-edge changes direction.
+        packed = [start >> 16]
+        prev_dir = (start & 0xFFFF) - packed[0]
+        he = start
+        while True:
+            seen.add(he)
+            he = next_he[he]
+            if he == start:
+                break
+            v = he >> 16
+            d = (he & 0xFFFF) - v
+            if d != prev_dir:
+                packed.append(v)
+                prev_dir = d
+
+        # Every vertex appended during the walk is a true corner; only the
+        # arbitrarily chosen start vertex may be collinear with its seam
+        # neighbors, so a single check is enough to fix it.
+        if len(packed) >= 3 and (
+            packed[-1] >> 8 == packed[1] >> 8 or packed[-1] & 255 == packed[1] & 255
+        ):
+            packed.pop(0)
+
+        chains.append([(v >> 8, v & 255) for v in packed])
+
+    # Order the contours from largest to smallest.
+    chains.sort(key=len, reverse=True)
+    return chains
 
 
 @final
@@ -78,13 +155,7 @@ class QrCodePainter:
 
     def __init__(self, msg: str) -> None:
         # Generate the Boolean matrix that represents the QR code.
-        qr = qrcode.QRCode()
-        qr.add_data(msg)
-        qr.make()
-
-        self.n = qr.modules_count
-        assert all(all(isinstance(v, bool) for v in row) for row in qr.modules)
-        self.modules = cast(list[list[bool]], qr.modules)
+        self.n, self.modules = _encode(msg)
 
         # For each connected component: list of closed point chains (polygons)
         # that forn one composite path.
@@ -94,142 +165,46 @@ class QrCodePainter:
     def _extract_polygons(self) -> None:
         """Extract simplified polygon boundaries for all connected components."""
 
-        def neighbors(r: int, c: int) -> Iterable[Point]:
-            for dr, dc in ((-1, 0), (0, -1), (0, 1), (1, 0)):
-                nr, nc = r + dr, c + dc
-                if 0 <= nr < self.n and 0 <= nc < self.n:
-                    yield nr, nc
-
-        visited = [[False] * self.n for _ in range(self.n)]
-
-        for r in range(self.n):
-            for c in range(self.n):
-                if not self.modules[r][c] or visited[r][c]:
-                    continue
-
-                # Flood-fill this connected component and count its square edges.
-                queue: deque[Point] = deque([(r, c)])
-                visited[r][c] = True
-                edge_counts: Counter[Edge] = Counter()
-
-                while queue:
-                    cr, cc = queue.popleft()
-
-                    # Count every edge of this module.
-                    p00, p01 = (cr, cc), (cr, cc + 1)
-                    p10, p11 = (cr + 1, cc), (cr + 1, cc + 1)
-                    for p, q in ((p00, p01), (p00, p10), (p01, p11), (p10, p11)):
-                        edge_counts[normalized_edge(p, q)] += 1
-
-                    # Add unvisited neighbors to the queue and mark them as visited.
-                    for nr, nc in neighbors(cr, cc):
-                        if self.modules[nr][nc] and not visited[nr][nc]:
-                            visited[nr][nc] = True
-                            queue.append((nr, nc))
-
-                # Edges used exactly once form the boundary graph (outer and holes).
-                boundary_edges = {e for e, cnt in edge_counts.items() if cnt == 1}
-                assert boundary_edges
-
-                # Build adjacency list of the boundary graph.
-                adj: dict[Point, set[Point]] = {}
-                for p, q in boundary_edges:
-                    adj.setdefault(p, set()).add(q)
-                    adj.setdefault(q, set()).add(p)
-
-                components = connected_components(adj)
-                components.sort(key=len, reverse=True)
-
-                # Find the best cycle for each component (largest to smallest).
-                chains: list[list[Point]] = []
-                for component in components:
-                    # Starting vertex is arbitrary → choose lexicographic minimum.
-                    init = min(component)
-                    edges_left = {
-                        e
-                        for e in boundary_edges
-                        if e[0] in component or e[1] in component
-                    }
-
-                    # Construct the initial cycle with a preference for edges
-                    # that are not collinear with the preceding edge (if there is one).
-                    # This ensures “wall-hugging” behaviour when entering a hole,
-                    # which leads to more visually pleasing results when rounding
-                    # corners.
-                    chain = [init]
-                    prec: Point | None = None
-
-                    while True:
-                        curr = chain[-1]
-                        closing = normalized_edge(curr, init)
-                        if closing in edges_left:
-                            edges_left.remove(closing)
-                            break
-
-                        # Available edges from curr that are still unused.
-                        succs = [
-                            v
-                            for v in adj[curr]
-                            if normalized_edge(curr, v) in edges_left
-                        ]
-
-                        if prec is not None:
-                            # Prefer a turn (non-collinear) over going straight.
-                            pv = prec
-                            succs.sort(key=lambda sv: collinear(pv, curr, sv))
-                        succ = succs[0]
-
-                        chain.append(succ)
-                        edges_left.remove(normalized_edge(curr, succ))
-                        prec = curr
-
-                    # The cycle does not cover the entire connected component.
-                    # Extend the cycle by constructing a new cycle that uses
-                    # edges that are not included in the cycle already, i.e. those
-                    # in `edges_left`, if available (still preferring turns).
-                    # If there is no such edge, use the same successor used before.
-                    while len(set(chain)) < len(component):
-                        new_chain = [init]
-                        prec = None
-                        idx = 1
-
-                        while True:
-                            curr = new_chain[-1]
-                            succs = [
-                                v
-                                for v in adj[curr]
-                                if normalized_edge(curr, v) in edges_left
-                            ]
-                            if not succs:
-                                if idx == len(chain):
-                                    break
-                                # Follow previous chain when no unused edge is available.
-                                succ = chain[idx]
-                                idx += 1
-                            else:
-                                if prec is not None:
-                                    pv = prec
-                                    succs.sort(key=lambda sv: collinear(pv, curr, sv))
-                                succ = succs[0]
-                                edges_left.remove(normalized_edge(curr, succ))
-
-                            new_chain.append(succ)
-                            prec = curr
-
-                        chain = new_chain
-
-                    # Remove collinear vertices to simplify polygons.
-                    i = 0
-                    while i < len(chain):
-                        p0, p1, p2 = chain[i - 1], chain[i], chain[(i + 1) % len(chain)]
-                        if collinear(p0, p1, p2):
-                            del chain[i]
-                        else:
-                            i += 1
-
-                    chains.append(chain)
-
-                self.point_chains.append(chains)
+        # Label 4-connected components in one pass instead of flood-filling
+        # each component with a Python-level BFS.
+        structure = np.array([[0, 1, 0], [1, 1, 1], [0, 1, 0]])
+        labels, num_labels = ndimage.label(self.modules, structure=structure)
+        sizes = np.bincount(labels.ravel())
+
+        # A single shift-and-compare pass over the zero-padded label matrix
+        # finds the boundary edges of every component at once: orthogonally
+        # adjacent filled cells always share a label, so a nonzero difference
+        # is a boundary edge whose magnitude names the component and whose
+        # sign gives the filled side. Each edge is emitted as a packed
+        # half-edge with the filled side on its left (see `_trace_contours`).
+        padded = np.pad(labels, 1)
+        d0 = np.diff(padded, axis=0)
+        d1 = np.diff(padded, axis=1)
+
+        half_edges: list[list[tuple[int, int]]] = [[] for _ in range(num_labels + 1)]
+        for (i, j), v in zip(np.argwhere(d0).tolist(), d0[d0 != 0].tolist()):
+            p, q = (i << 8) | (j - 1), (i << 8) | j
+            # Filled below → travel west, filled above → travel east.
+            half_edges[abs(v)].append((q, p) if v > 0 else (p, q))
+        for (i, j), v in zip(np.argwhere(d1).tolist(), d1[d1 != 0].tolist()):
+            p, q = ((i - 1) << 8) | j, (i << 8) | j
+            # Filled to the east → travel south, to the west → north.
+            half_edges[abs(v)].append((p, q) if v > 0 else (q, p))
+
+        for k, sl in enumerate(ndimage.find_objects(labels), start=1):
+            r0, c0 = sl[0].start, sl[1].start
+            h, w = sl[0].stop - r0, sl[1].stop - c0
+
+            # Components that fill their bounding box completely (isolated
+            # modules and larger axis-aligned rectangles are very common in
+            # QR codes) have no holes or concavities: their contour is just
+            # the four box corners, ordered to keep the filled side on the
+            # left like the general path.
+            if sizes[k] == h * w:
+                corners = [(r0, c0), (r0 + h, c0), (r0 + h, c0 + w), (r0, c0 + w)]
+                self.point_chains.append([corners])
+            else:
+                self.point_chains.append(_trace_contours(half_edges[k]))
 
     def tikz(self, *, size: str, style: str, full_size: bool = False) -> str:
         """Return TikZ code that draws all polygons of the QR code."""
@@ -262,16 +237,19 @@ class QrCodePainter:
 
         def move(p: Point | None, q: Point) -> str:
             qr, qc = q
-            abs_cmd = f"M{qc} {qr}"
             if p is None:
-                return abs_cmd
-            rel_cmd = f"m{qc - p[1]} {qr - p[0]}"
-            return abs_cmd if len(abs_cmd) <= len(rel_cmd) else rel_cmd
+                return f"M{qc} {qr}"
+            # Compare the argument lengths without formatting the loser.
+            rr, rc = qr - p[0], qc - p[1]
+            if _numlen(qc) + _numlen(qr) <= _numlen(rc) + _numlen(rr):
+                return f"M{qc} {qr}"
+            return f"m{rc} {rr}"
 
         def line(axis: str, src: int, dst: int) -> str:
-            abs_arg, rel_arg = str(dst), str(dst - src)
-            abs_cmd, rel_cmd = axis.upper() + abs_arg, axis + rel_arg
-            return abs_cmd if len(abs_arg) <= len(rel_arg) else rel_cmd
+            rel = dst - src
+            if _numlen(dst) <= _numlen(rel):
+                return axis.upper() + str(dst)
+            return axis + str(rel)
 
         prev: Point | None = None
         for chains in self.point_chains:
@@ -294,21 +272,23 @@ class QrCodePainter:
 
             yield "".join(parts)
 
-    @property
-    def svg_paths(self) -> Iterable[str]:
-        """Yield one SVG <path> element per polygon group."""
-        for poly in self._generate_svg_polygons(relative=False):
-            yield f'<path fill-rule="evenodd" d="{poly}"/>'
+    @cached_property
+    def svg_paths(self) -> tuple[str, ...]:
+        """One SVG <path> element per polygon group; computed once and cached."""
+        return tuple(
+            f'<path fill-rule="evenodd" d="{poly}"/>'
+            for poly in self._generate_svg_polygons(relative=False)
+        )
 
-    @property
+    @cached_property
     def svg_path(self) -> str:
-        """Return a single SVG <path> element containing all polygons."""
+        """A single SVG <path> element containing all polygons; cached."""
         path = "".join(self._generate_svg_polygons(relative=True))
         return f'<path fill-rule="evenodd" d="{path}"/>'
 
-    @property
+    @cached_property
     def svg(self) -> str:
-        """Return a complete SVG document containing the merged path."""
+        """A complete SVG document containing the merged path; cached."""
         return _wrap_svg(self.n, self.svg_path)
 
 
@@ -10,10 +10,9 @@ from typing import Callable
 import cairosvg
 import numpy as np
 import pytest
-import qrcode
 from PIL import Image
 
-from polyqr import QrCodePainter
+from polyqr import QrCodePainter, _encode
 
 from .defs import test_messages
 
@@ -35,11 +34,9 @@ def _test_svg(msg: str, make_svg: Callable[[QrCodePainter], str]) -> None:
     Test that the SVG document produced by ``make_svg``, when rasterized
     using `cairosvg`, is equivalent to the output of :class:`qrcode.QRCode`.
     """
-    # Reference matrix (True = black)
-    qr = qrcode.QRCode()
-    qr.add_data(msg)
-    qr.make()
-    ref_matrix = np.array(qr.modules, dtype=bool)
+    # Reference matrix (True = black); the cached encoder is shared with
+    # :class:`QrCodePainter`, so the QR code is only generated once per message.
+    _, ref_matrix = _encode(msg)
 
     # Generate and render the SVG document for the same message.
     painter = QrCodePainter(msg)
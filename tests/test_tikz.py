@@ -14,9 +14,8 @@ from typing import Callable
 import fitz
 import numpy as np
 import pytest
-import qrcode
 
-from polyqr import QrCodePainter, run_tikz
+from polyqr import QrCodePainter, _encode, run_tikz
 
 from .defs import test_messages
 
@@ -45,11 +44,9 @@ def _test_tikz(
     This function requires a working LaTeX installation with pdflatex and TikZ.
     """
 
-    # Reference matrix (True = black)
-    qr = qrcode.QRCode()
-    qr.add_data(msg)
-    qr.make()
-    ref_matrix = np.array(qr.modules, dtype=bool)
+    # Reference matrix (True = black); the cached encoder is shared with
+    # :class:`QrCodePainter`, so the QR code is only generated once per message.
+    _, ref_matrix = _encode(msg)
 
     # Produce TikZ for the same message with an arbitrary module size.
     tikz, size = make_tikz()
@@ -85,7 +82,7 @@ def _test_tikz(
         assert abs(h / denom - 1) <= 5e-3
 
         # points → pixels at 1 pixel per module
-        scale = qr.modules_count / w
+        scale = ref_matrix.shape[0] / w
         pix = page.get_pixmap(
             matrix=fitz.Matrix(scale, scale),
             colorspace=fitz.csGRAY,
@@ -149,11 +146,7 @@ def test_run_tikz(msg: str, full_size: bool, tmp_path: Path) -> None:
         with redirect_stdout(f):
             run_tikz()
 
-        qr = qrcode.QRCode()
-        qr.add_data(msg)
-        qr.make()
-
-        return f.getvalue(), 1 if full_size else qr.modules_count
+        return f.getvalue(), 1 if full_size else _encode(msg)[0]
 
     # Use the helper function
     _test_tikz(msg, make_tikz, tmp_path)